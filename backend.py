@@ -1,9 +1,14 @@
 from pymongo import MongoClient
 from geopy.distance import geodesic
 from twilio.rest import Client
+import asyncio
 import datetime
-import time
 import random
+import joblib
+
+from ingest_compression import FixCompressor
+from risk_surface import RiskSurface, farm_bounds, get_time_of_day
+from tick_scheduler import TickScheduler
 
 # Twilio SMS Alert Setup
 def send_sms_alert(body, to):
@@ -28,6 +33,9 @@ cow_locations = db["cow_locations"]
 forest_zones = db["forest_zones"]
 leopard_sightings = db["leopard_sightings"]
 
+# The dashboard reads only recent fixes
+cow_locations.create_index([("timestamp", -1)])
+
 # Insert a synthetic leopard marker (only once)
 leopard_exists = leopard_sightings.find_one({"leopard_id": "LEO_SYNTH001"})
 if not leopard_exists:
@@ -52,6 +60,30 @@ cow_positions = {
     for i in range(10)
 }
 
+# Precomputed ML risk surface for O(1) per-fix risk lookup
+try:
+    model = joblib.load("risk_predictor_model.pkl")
+    encoder = joblib.load("time_of_day_encoder.pkl")
+    forest = forest_zones.find_one({})
+    leopards = list(leopard_sightings.find({}))
+    risk_surface = RiskSurface(model, encoder, farm_bounds(forest, leopards))
+    risk_surface.update(forest, leopards)
+    print(f"✅ Risk surface ready: {risk_surface.rows}x{risk_surface.cols} cells")
+except Exception as e:
+    risk_surface = None
+    print(f"⚠️ Risk surface unavailable: {e}")
+
+def refresh_risk_surface():
+    # Only cells near a changed sighting or zone are re-evaluated
+    if risk_surface is not None:
+        rebuilt = risk_surface.update(forest_zones.find_one({}), list(leopard_sightings.find({})))
+        if rebuilt:
+            print(f"🗺️ Risk surface updated ({rebuilt} cells)")
+
+# Ingest compression: skip near-duplicate fixes, keep geofence/risk changes.
+# Douglas-Peucker (dp_tolerance_m) stays off so stored positions are never held back.
+compressor = FixCompressor(min_distance_m=10.0, heartbeat_s=60.0)
+
 # Cooldown timer to avoid SMS spam
 last_alert_time = {}
 
@@ -87,45 +119,61 @@ def check_leopard_proximity(coord):
     return "LOW"
 
 # Cow simulation logic
-def simulate_cow_movements(iterations=20):
-    for step in range(iterations):
+def process_cow(cow_id, position):
+    # Random movement
+    lon_shift = random.uniform(-0.0003, 0.0003)
+    lat_shift = random.uniform(-0.0003, 0.0003)
+    position[0] += lon_shift
+    position[1] += lat_shift
+
+    cow_doc = {
+        "cow_id": cow_id,
+        "timestamp": datetime.datetime.utcnow(),
+        "location": {
+            "type": "Point",
+            "coordinates": [position[0], position[1]]
+        }
+    }
+
+    # Danger checks
+    in_forest = is_inside_forest(position)
+    leopard_risk = check_leopard_proximity(position)
+
+    ai_risk = risk_surface.predict(position[1], position[0], get_time_of_day()) if risk_surface else None
+
+    # One line per cow: cows run concurrently, so separate prints would interleave
+    print(f"🐄 {cow_id} at location: {[position[1], position[0]]} | "
+          f"{'🌲 INSIDE forest zone!' if in_forest else '✅ outside forest zone'} | "
+          f"🐆 Leopard Risk: {leopard_risk} | 🧠 AI Risk: {ai_risk or 'N/A'}")
+
+    # Only store fixes that moved, hit the heartbeat, or changed geofence/risk state
+    docs = compressor.add(cow_id, cow_doc, (in_forest, leopard_risk, ai_risk))
+    if docs:
+        cow_locations.insert_many(docs)
+
+    # Alert logic
+    if (in_forest or leopard_risk == "HIGH") and should_alert(cow_id):
+        msg = f"🚨 ALERT!\nCow: {cow_id}\nLocation: {position}\nForest: {'Yes' if in_forest else 'No'}\nLeopard Risk: {leopard_risk}\nAI Risk: {ai_risk or 'N/A'}"
+        recipient = st.secrets["alert"]["recipient_number"]
+        send_sms_alert(msg, recipient)
+
+def simulate_cow_movements(iterations=20, period=5.0):
+    # Ticks run on fixed 5 s deadlines; all cows are processed concurrently
+    scheduler = TickScheduler(period=period)
+
+    async def tick(step):
         print(f"\n🚶‍♀️ STEP {step + 1}")
-        for cow_id, position in cow_positions.items():
-            # Random movement
-            lon_shift = random.uniform(-0.0003, 0.0003)
-            lat_shift = random.uniform(-0.0003, 0.0003)
-            position[0] += lon_shift
-            position[1] += lat_shift
-
-            cow_doc = {
-                "cow_id": cow_id,
-                "timestamp": datetime.datetime.utcnow(),
-                "location": {
-                    "type": "Point",
-                    "coordinates": [position[0], position[1]]
-                }
-            }
-            cow_locations.insert_one(cow_doc)
-            print(f"🐄 {cow_id} at location: {[position[1], position[0]]}")
-
-            # Danger checks
-            in_forest = is_inside_forest(position)
-            leopard_risk = check_leopard_proximity(position)
-
-            if in_forest:
-                print("🌲 Cow is INSIDE forest zone!")
-            else:
-                print("✅ Cow is outside forest zone.")
-
-            print(f"🐆 Leopard Risk: {leopard_risk}")
-
-            # Alert logic
-            if (in_forest or leopard_risk == "HIGH") and should_alert(cow_id):
-                msg = f"🚨 ALERT!\nCow: {cow_id}\nLocation: {position}\nForest: {'Yes' if in_forest else 'No'}\nLeopard Risk: {leopard_risk}"
-                recipient = st.secrets["alert"]["recipient_number"]
-                send_sms_alert(msg, recipient)
-
-        time.sleep(5)
+        await scheduler.run_blocking(refresh_risk_surface)
+        await scheduler.map_blocking(process_cow, cow_positions.items())
+
+    stats = asyncio.run(scheduler.run(tick, max_ticks=iterations))
+    print(f"⏱️ Scheduler stats: {stats}")
+
+    # Write fixes still buffered if Douglas-Peucker is enabled
+    docs = compressor.flush()
+    if docs:
+        cow_locations.insert_many(docs)
+    print(f"🗜️ Compression stats: {compressor.stats()}")
 
 # Run it!
 simulate_cow_movements()
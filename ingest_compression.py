@@ -0,0 +1,154 @@
+import math
+import threading
+
+METERS_PER_DEG_LAT = 111320.0
+
+
+def _to_xy(lat, lon, lat0, lon0):
+    """Local equirectangular projection in meters around (lat0, lon0)"""
+    x = (lon - lon0) * METERS_PER_DEG_LAT * math.cos(math.radians(lat0))
+    y = (lat - lat0) * METERS_PER_DEG_LAT
+    return x, y
+
+
+def _distance_m(lat1, lon1, lat2, lon2):
+    x, y = _to_xy(lat2, lon2, lat1, lon1)
+    return math.hypot(x, y)
+
+
+def _perpendicular_m(point, start, end):
+    """Distance in meters from a point to the segment start-end, all (lat, lon)"""
+    px, py = _to_xy(point[0], point[1], start[0], start[1])
+    ex, ey = _to_xy(end[0], end[1], start[0], start[1])
+    length_sq = ex * ex + ey * ey
+    if length_sq == 0:
+        return math.hypot(px, py)
+    t = max(0.0, min(1.0, (px * ex + py * ey) / length_sq))
+    return math.hypot(px - t * ex, py - t * ey)
+
+
+def douglas_peucker(points, tolerance_m, keep=None):
+    """Indices of points to keep after Douglas-Peucker simplification.
+
+    ``points`` are (lat, lon) pairs; indices in ``keep`` are never dropped,
+    and the first and last points are always kept.
+    """
+    if len(points) <= 2:
+        return list(range(len(points)))
+
+    kept = {0, len(points) - 1} | set(keep or ())
+    anchors = sorted(kept)
+    stack = list(zip(anchors, anchors[1:]))
+    while stack:
+        first, last = stack.pop()
+        max_dist, index = 0.0, None
+        for i in range(first + 1, last):
+            dist = _perpendicular_m(points[i], points[first], points[last])
+            if dist > max_dist:
+                max_dist, index = dist, i
+        if index is not None and max_dist > tolerance_m:
+            kept.add(index)
+            stack.append((first, index))
+            stack.append((index, last))
+    return sorted(kept)
+
+
+def _coords(doc):
+    lon, lat = doc["location"]["coordinates"][:2]
+    return lat, lon
+
+
+class FixCompressor:
+    """Ingest-side compression of cow_locations documents.
+
+    A fix is dropped when it moved less than ``min_distance_m`` from the last
+    accepted fix and arrived within ``heartbeat_s`` of it. Fixes whose state
+    (geofence / risk) differs from the previous fix, and heartbeat fixes,
+    are always kept. With ``dp_tolerance_m`` set, accepted fixes are also
+    buffered per cow and each window of ``window_size`` fixes is simplified
+    with Douglas-Peucker before being written.
+    """
+
+    def __init__(self, min_distance_m=10.0, heartbeat_s=60.0, dp_tolerance_m=None, window_size=10):
+        self.min_distance_m = min_distance_m
+        self.heartbeat_s = heartbeat_s
+        self.dp_tolerance_m = dp_tolerance_m
+        self.window_size = window_size
+
+        self.received = 0
+        self.stored = 0
+        self._last_accepted = {}  # cow_id -> doc
+        self._last_state = {}     # cow_id -> state
+        self._last_written = {}   # cow_id -> doc
+        self._windows = {}        # cow_id -> [(doc, pinned)]
+        self._lock = threading.Lock()
+
+    def add(self, cow_id, doc, state=None):
+        """Feed one fix and return the documents to write now (possibly none)"""
+        with self._lock:
+            self.received += 1
+            pinned = (cow_id not in self._last_written or
+                      state != self._last_state.get(cow_id) or
+                      self._seconds_since(self._last_written[cow_id], doc) >= self.heartbeat_s)
+            self._last_state[cow_id] = state
+
+            last = self._last_accepted.get(cow_id)
+            if not pinned and last is not None:
+                moved = _distance_m(*_coords(last), *_coords(doc))
+                if moved < self.min_distance_m and self._seconds_since(last, doc) < self.heartbeat_s:
+                    return []
+            self._last_accepted[cow_id] = doc
+
+            if self.dp_tolerance_m is None:
+                return self._emit(cow_id, [doc])
+
+            window = self._windows.setdefault(cow_id, [])
+            window.append((doc, pinned))
+            if pinned or len(window) >= self.window_size:
+                return self._flush_window(cow_id)
+            return []
+
+    def flush(self, cow_id=None):
+        """Return buffered documents for one cow (or all cows) so nothing is lost on shutdown"""
+        with self._lock:
+            cow_ids = [cow_id] if cow_id is not None else list(self._windows)
+            docs = []
+            for cid in cow_ids:
+                docs.extend(self._flush_window(cid))
+            return docs
+
+    def compression_ratio(self):
+        """Fixes received per document stored"""
+        return self.received / self.stored if self.stored else 0.0
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "stored": self.stored,
+            "dropped": self.received - self.stored - sum(len(w) for w in self._windows.values()),
+            "compression_ratio": round(self.compression_ratio(), 2),
+        }
+
+    def _seconds_since(self, earlier, later):
+        return (later["timestamp"] - earlier["timestamp"]).total_seconds()
+
+    def _flush_window(self, cow_id):
+        window = self._windows.pop(cow_id, [])
+        if not window:
+            return []
+
+        # Simplify against the last written fix so the trajectory stays connected
+        anchor = self._last_written.get(cow_id)
+        entries = ([(anchor, True)] if anchor is not None else []) + window
+        points = [_coords(doc) for doc, _ in entries]
+        keep = [i for i, (_, pinned) in enumerate(entries) if pinned]
+        kept = douglas_peucker(points, self.dp_tolerance_m, keep)
+
+        offset = 1 if anchor is not None else 0
+        return self._emit(cow_id, [entries[i][0] for i in kept if i >= offset])
+
+    def _emit(self, cow_id, docs):
+        if docs:
+            self._last_written[cow_id] = docs[-1]
+            self.stored += len(docs)
+        return docs
@@ -11,9 +11,11 @@ import time
 from geopy.distance import geodesic
 import joblib
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
+from risk_surface import RiskSurface, farm_bounds, get_time_of_day
+
 # -----------------------
 # Load ML Model + Encoder with better error handling
 # -----------------------
@@ -89,18 +91,6 @@ else:
 # -----------------------
 # Helper Functions
 # -----------------------
-def get_time_of_day():
-    """Get current time of day category"""
-    hour = datetime.now().hour
-    if 5 <= hour < 12:
-        return 'morning'
-    elif 12 <= hour < 17:
-        return 'afternoon'
-    elif 17 <= hour < 20:
-        return 'evening'
-    else:
-        return 'night'
-
 def predict_risk(dist_forest, dist_leopard, time_of_day):
     """Predict risk level using ML model"""
     if not model_loaded or model is None or encoder is None:
@@ -115,6 +105,11 @@ def predict_risk(dist_forest, dist_leopard, time_of_day):
         st.error(f"Prediction error: {str(e)}")
         return "Error"
 
+@st.cache_resource(max_entries=1)
+def load_risk_surface(bounds):
+    """Precomputed risk grids for the farm area (rebuilt only when the forest or sightings area changes)"""
+    return RiskSurface(model, encoder, bounds)
+
 # -----------------------
 # Streamlit UI
 # -----------------------
@@ -154,9 +149,22 @@ cows = []
 leopards = []
 forest = None
 
+# A few compression heartbeats (60 s): no fix for this long means the cow is offline
+ONLINE_WINDOW_S = 300
+
 if db_connected and db is not None:
     try:
-        cows_cursor = cow_locations.find().sort("timestamp", -1).limit(10)
+        # Latest fix per cow: stationary cows only write on the compression heartbeat,
+        # so the newest N documents would be filled by the cows that are moving.
+        # Only recent fixes are grouped; cows with no fix inside the window are offline.
+        recent = datetime.utcnow() - timedelta(seconds=ONLINE_WINDOW_S)
+        cows_cursor = cow_locations.aggregate([
+            {"$match": {"timestamp": {"$gte": recent}}},
+            {"$sort": {"timestamp": -1}},
+            {"$group": {"_id": "$cow_id", "latest": {"$first": "$$ROOT"}}},
+            {"$replaceRoot": {"newRoot": "$latest"}},
+            {"$sort": {"timestamp": -1}},
+        ])
         cows = list(cows_cursor)
         leopards = list(leopard_sightings.find())
         forest = forest_zones.find_one()
@@ -202,6 +210,21 @@ if cows:
             except Exception as e:
                 st.warning(f"Could not draw forest zone: {e}")
 
+        # Risk heatmap from the precomputed surface: the model runs per grid cell
+        # only when a sighting or zone changes, and per-cow risk is a lookup
+        risk_surface = None
+        current_time = get_time_of_day()
+        # Bounds come from the forest and sightings only; cows outside fall back to the model
+        bounds = farm_bounds(forest, leopards)
+        if model_loaded and bounds:
+            try:
+                risk_surface = load_risk_surface(bounds)
+                risk_surface.update(forest, leopards)
+                risk_surface.add_heatmap(map_obj, current_time)
+            except Exception as e:
+                risk_surface = None
+                st.warning(f"Could not build risk heatmap: {e}")
+
         # Add leopard markers first (so they appear below cow markers)
         leopard_positions = []
         for leo in leopards:
@@ -259,9 +282,10 @@ if cows:
                         dist = geodesic((lat, lon), (leo_lat, leo_lon)).meters
                         nearest_leopard_dist = min(nearest_leopard_dist, dist)
 
-                # Predict risk level
-                current_time = get_time_of_day()
-                risk = predict_risk(dist_to_forest, nearest_leopard_dist, current_time)
+                # Look up risk level, falling back to the model outside the grid
+                risk = risk_surface.lookup(lat, lon, current_time) if risk_surface else None
+                if risk is None:
+                    risk = predict_risk(dist_to_forest, nearest_leopard_dist, current_time)
                 risk_summary[risk] = risk_summary.get(risk, 0) + 1
 
                 # Choose marker color based on risk
@@ -0,0 +1,233 @@
+import math
+import threading
+from datetime import datetime
+
+import folium
+import numpy as np
+
+# Risk classes produced by the model, stored as uint8 codes in the grids
+RISK_LEVELS = ['low', 'medium', 'high', 'very high']
+UNKNOWN_RISK = 255
+
+# Training data covered 10-1500 m to forest and 0-2000 m to a leopard.
+# A RandomForest is constant beyond its largest split, so clipping to these
+# ranges doesn't change predictions but keeps far-away cells from changing
+# when a sighting moves.
+MAX_FOREST_DIST = 1500.0
+MAX_LEOPARD_DIST = 2000.0
+
+# Distance to forest the dashboard has always used when there is no forest zone
+NO_FOREST_DIST = 999.0
+
+# Upper bound on grid size; larger areas get coarser cells
+MAX_CELLS = 250000
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG_LAT = 111320.0
+
+# Heatmap colours (RGBA) per risk code
+RISK_COLORS = {
+    0: (0, 170, 0, 60),
+    1: (255, 165, 0, 140),
+    2: (255, 69, 0, 180),
+    3: (200, 0, 0, 210),
+}
+
+
+def get_time_of_day(now=None):
+    """Get current time of day category"""
+    hour = (now or datetime.now()).hour
+    if 5 <= hour < 12:
+        return 'morning'
+    elif 12 <= hour < 17:
+        return 'afternoon'
+    elif 17 <= hour < 20:
+        return 'evening'
+    else:
+        return 'night'
+
+
+def haversine_m(lat, lon, lat0, lon0):
+    """Vectorised great-circle distance in meters from (lat, lon) arrays to one point"""
+    lat, lon = np.radians(lat), np.radians(lon)
+    lat0, lon0 = math.radians(lat0), math.radians(lon0)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat) * math.cos(lat0) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def forest_center(forest):
+    """(lat, lon) of the forest polygon centroid, or None if there is no forest zone"""
+    if not forest or "area" not in forest:
+        return None
+    poly = forest["area"]["coordinates"][0]
+    return (sum(pt[1] for pt in poly) / len(poly), sum(pt[0] for pt in poly) / len(poly))
+
+
+def leopard_points(leopards):
+    """(lat, lon) for every leopard sighting"""
+    return [(leo["location"]["coordinates"][1], leo["location"]["coordinates"][0]) for leo in leopards]
+
+
+def farm_bounds(forest=None, leopards=(), points=(), padding_m=1000.0, snap_deg=0.01):
+    """Bounding box (min_lat, min_lon, max_lat, max_lon) around the forest, leopards and extra (lat, lon) points.
+
+    The box is padded and snapped outwards to a ``snap_deg`` grid. ``points``
+    is for fixed farm corners, not cow positions, so the bounds don't change
+    as cows move; cows outside the grid fall back to the model.
+    """
+    lats, lons = [], []
+    if forest and "area" in forest:
+        for pt in forest["area"]["coordinates"][0]:
+            lons.append(pt[0])
+            lats.append(pt[1])
+    for lat, lon in leopard_points(leopards) + list(points):
+        lats.append(lat)
+        lons.append(lon)
+    if not lats:
+        return None
+
+    pad_lat = padding_m / METERS_PER_DEG_LAT
+    pad_lon = padding_m / (METERS_PER_DEG_LAT * math.cos(math.radians(sum(lats) / len(lats))))
+    return (
+        round(math.floor((min(lats) - pad_lat) / snap_deg) * snap_deg, 6),
+        round(math.floor((min(lons) - pad_lon) / snap_deg) * snap_deg, 6),
+        round(math.ceil((max(lats) + pad_lat) / snap_deg) * snap_deg, 6),
+        round(math.ceil((max(lons) + pad_lon) / snap_deg) * snap_deg, 6),
+    )
+
+
+class RiskSurface:
+    """Precomputed model risk over a lat/lon grid, one uint8 grid per time of day.
+
+    Risk only depends on the distance to the forest, the distance to the
+    nearest leopard and the time of day, so the model is evaluated once per
+    grid cell and per-fix risk becomes an array lookup. ``update`` re-runs
+    the model only for cells whose (clipped) distances changed. A sighting
+    affects every cell within MAX_LEOPARD_DIST of its old or new position,
+    which on a farm a few km across is most of the grid, so the saving comes
+    from skipping unchanged refreshes rather than from small rebuilds.
+    """
+
+    def __init__(self, model, encoder, bounds, cell_size_m=25.0, max_cells=MAX_CELLS):
+        self.model = model
+        self.encoder = encoder
+        self.min_lat, self.min_lon, self.max_lat, self.max_lon = bounds
+
+        mid_lat = (self.min_lat + self.max_lat) / 2
+        height_m = (self.max_lat - self.min_lat) * METERS_PER_DEG_LAT
+        width_m = (self.max_lon - self.min_lon) * METERS_PER_DEG_LAT * math.cos(math.radians(mid_lat))
+        if height_m * width_m / cell_size_m ** 2 > max_cells:
+            cell_size_m = math.sqrt(height_m * width_m / max_cells)
+        self.cell_size_m = cell_size_m
+
+        self.dlat = cell_size_m / METERS_PER_DEG_LAT
+        self.dlon = cell_size_m / (METERS_PER_DEG_LAT * math.cos(math.radians(mid_lat)))
+        self.rows = max(1, math.ceil((self.max_lat - self.min_lat) / self.dlat))
+        self.cols = max(1, math.ceil((self.max_lon - self.min_lon) / self.dlon))
+        self.max_lat = self.min_lat + self.rows * self.dlat
+        self.max_lon = self.min_lon + self.cols * self.dlon
+
+        # Cell centres; row 0 is the southern edge
+        lats = self.min_lat + (np.arange(self.rows) + 0.5) * self.dlat
+        lons = self.min_lon + (np.arange(self.cols) + 0.5) * self.dlon
+        self._lat, self._lon = np.meshgrid(lats, lons, indexing="ij")
+
+        self.times = list(encoder.classes_)
+        self.grids = {t: np.full((self.rows, self.cols), UNKNOWN_RISK, dtype=np.uint8) for t in self.times}
+        self._dist_forest = None
+        self._dist_leopard = None
+        self._forest_center = None
+        self._leopards = []
+
+        # The dashboard shares one surface across sessions via st.cache_resource
+        self._lock = threading.Lock()
+
+    def _distances(self, forest, leopards):
+        center = forest_center(forest)
+        if center is None:
+            dist_forest = np.full(self._lat.shape, NO_FOREST_DIST, dtype=np.float32)
+        else:
+            dist_forest = np.minimum(haversine_m(self._lat, self._lon, *center), MAX_FOREST_DIST).astype(np.float32)
+
+        dist_leopard = np.full(self._lat.shape, MAX_LEOPARD_DIST, dtype=np.float32)
+        for leo_lat, leo_lon in leopard_points(leopards):
+            np.minimum(dist_leopard, haversine_m(self._lat, self._lon, leo_lat, leo_lon), out=dist_leopard)
+        return dist_forest, dist_leopard
+
+    def update(self, forest, leopards, tolerance_m=0.5):
+        """Recompute risk for cells affected by changed sightings or zones. Returns the number of cells rebuilt."""
+        dist_forest, dist_leopard = self._distances(forest, leopards)
+        with self._lock:
+            self._forest_center, self._leopards = forest_center(forest), leopard_points(leopards)
+            return self._rebuild(dist_forest, dist_leopard, tolerance_m)
+
+    def _rebuild(self, dist_forest, dist_leopard, tolerance_m):
+        if self._dist_forest is None:
+            changed = np.ones(self._lat.shape, dtype=bool)
+        else:
+            changed = (np.abs(dist_forest - self._dist_forest) > tolerance_m) | \
+                      (np.abs(dist_leopard - self._dist_leopard) > tolerance_m)
+
+        self._dist_forest, self._dist_leopard = dist_forest, dist_leopard
+        n_changed = int(changed.sum())
+        if n_changed == 0:
+            return 0
+
+        code_for = {level: code for code, level in enumerate(RISK_LEVELS)}
+        features = np.column_stack([dist_forest[changed], dist_leopard[changed], np.zeros(n_changed)])
+        for time_of_day in self.times:
+            features[:, 2] = self.encoder.transform([time_of_day])[0]
+            predictions = self.model.predict(features)
+            self.grids[time_of_day][changed] = [code_for.get(p, UNKNOWN_RISK) for p in predictions]
+        return n_changed
+
+    def _cell(self, lat, lon):
+        row = int((lat - self.min_lat) / self.dlat)
+        col = int((lon - self.min_lon) / self.dlon)
+        if lat < self.min_lat or lon < self.min_lon or row >= self.rows or col >= self.cols:
+            return None
+        return row, col
+
+    def lookup(self, lat, lon, time_of_day):
+        """Risk level at a position, or None if it is outside the grid or not computed yet"""
+        cell = self._cell(lat, lon)
+        if cell is None or time_of_day not in self.grids:
+            return None
+        with self._lock:
+            code = self.grids[time_of_day][cell]
+        return RISK_LEVELS[code] if code < len(RISK_LEVELS) else None
+
+    def predict(self, lat, lon, time_of_day):
+        """Risk level at a position: grid lookup, or a direct model call outside the grid"""
+        risk = self.lookup(lat, lon, time_of_day)
+        if risk is not None:
+            return risk
+
+        with self._lock:
+            center, leopards = self._forest_center, self._leopards
+        if center is None:
+            dist_forest = NO_FOREST_DIST
+        else:
+            dist_forest = min(float(haversine_m(lat, lon, *center)), MAX_FOREST_DIST)
+        dist_leopard = min([float(haversine_m(lat, lon, *leo)) for leo in leopards] + [MAX_LEOPARD_DIST])
+        X = np.array([[dist_forest, dist_leopard, self.encoder.transform([time_of_day])[0]]])
+        return self.model.predict(X)[0]
+
+    def to_rgba(self, time_of_day):
+        """RGBA image (rows x cols x 4, uint8) of the risk grid for one time of day"""
+        with self._lock:
+            grid = self.grids[time_of_day].copy()
+        image = np.zeros(grid.shape + (4,), dtype=np.uint8)
+        for code, color in RISK_COLORS.items():
+            image[grid == code] = color
+        return image
+
+    def add_heatmap(self, map_obj, time_of_day, opacity=0.6):
+        """Draw the risk grid for one time of day as an image overlay on a folium map"""
+        folium.raster_layers.ImageOverlay(
+            image=self.to_rgba(time_of_day),
+            bounds=[[self.min_lat, self.min_lon], [self.max_lat, self.max_lon]],
+            origin="lower",
+            opacity=opacity,
+            name=f"Risk heatmap ({time_of_day})",
+        ).add_to(map_obj)
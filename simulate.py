@@ -1,11 +1,14 @@
 # cow_simulator.py
 
+import asyncio
 import pymongo
 import random
 from datetime import datetime
-import time
 import streamlit as st
 
+from ingest_compression import FixCompressor
+from tick_scheduler import TickScheduler
+
 # --- Load secrets (Mongo URI) ---
 mongo_uri = st.secrets["mongo"]["connection_string"]
 
@@ -14,6 +17,9 @@ client = pymongo.MongoClient(mongo_uri)
 db = client["mootrack"]
 collection = db["cow_locations"]
 
+# The dashboard reads only recent fixes
+collection.create_index([("timestamp", -1)])
+
 # Base location for cows
 base_lat, base_lon = 13.0000, 74.8000  # You can change this to your actual farm area
 num_cows = 5
@@ -29,28 +35,39 @@ cow_positions = {
     } for cow_id in cow_ids
 }
 
-print("🚜 Starting MooTrack cow simulator (MongoDB edition)...")
+# Skip near-duplicate fixes from stationary or grazing cows
+compressor = FixCompressor(min_distance_m=10.0, heartbeat_s=60.0)
+
+def update_cow(cow_id, pos):
+    # Random small movement
+    pos["lat"] += random.uniform(-0.0001, 0.0001)
+    pos["lon"] += random.uniform(-0.0001, 0.0001)
 
-while True:
-    for cow_id, pos in cow_positions.items():
-        # Random small movement
-        pos["lat"] += random.uniform(-0.0001, 0.0001)
-        pos["lon"] += random.uniform(-0.0001, 0.0001)
-
-        # Construct MongoDB document
-        doc = {
-            "cow_id": cow_id,
-            "timestamp": datetime.utcnow(),
-            "location": {
-                "type": "Point",
-                "coordinates": [pos["lon"], pos["lat"]]
-            }
+    # Construct MongoDB document
+    doc = {
+        "cow_id": cow_id,
+        "timestamp": datetime.utcnow(),
+        "location": {
+            "type": "Point",
+            "coordinates": [pos["lon"], pos["lat"]]
         }
+    }
 
-        # Insert updated cow position into MongoDB
-        collection.insert_one(doc)
+    # Insert updated cow position into MongoDB (unless compressed away)
+    docs = compressor.add(cow_id, doc)
+    if docs:
+        collection.insert_many(docs)
         print(f"🐄 Updated {cow_id} → ({pos['lat']:.6f}, {pos['lon']:.6f})")
 
-    # Sleep before next update
-    time.sleep(5)
+# Update every cow on fixed 5 s deadlines (inserts overlap across cows)
+scheduler = TickScheduler(period=5.0)
+
+async def tick(step):
+    await scheduler.map_blocking(update_cow, cow_positions.items())
+    if step % 12 == 0:
+        print(f"⏱️ Scheduler stats: {scheduler.stats()}")
+        print(f"🗜️ Compression stats: {compressor.stats()}")
+
+print("🚜 Starting MooTrack cow simulator (MongoDB edition)...")
 
+asyncio.run(scheduler.run(tick))
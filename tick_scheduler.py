@@ -0,0 +1,100 @@
+import asyncio
+
+class TickScheduler:
+    """Run a coroutine on fixed deadlines instead of sleep-after-work.
+
+    Ticks are anchored to a grid of ``period`` seconds, so processing time
+    does not stretch the real update interval. Blocking work (MongoDB,
+    geodesic checks, Twilio) is pushed to worker threads so many cows are
+    handled at once. When a tick overruns, missed deadlines are either
+    skipped ("skip") or merged into one immediate catch-up tick
+    ("coalesce") rather than being queued up.
+    """
+
+    def __init__(self, period=5.0, max_concurrency=16, overrun_policy="skip"):
+        if period <= 0:
+            raise ValueError("period must be positive")
+        if overrun_policy not in ("skip", "coalesce"):
+            raise ValueError("overrun_policy must be 'skip' or 'coalesce'")
+
+        self.period = period
+        self.max_concurrency = max_concurrency
+        self.overrun_policy = overrun_policy
+
+        # Lag = how late a tick started compared to its deadline;
+        # overrun = how far a tick ran past the start of the next slot
+        self.tick_count = 0
+        self.overrun_count = 0
+        self.skipped_ticks = 0
+        self.last_overrun = 0.0
+        self.max_overrun = 0.0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.last_duration = 0.0
+
+        self._semaphore = None
+
+    async def run_blocking(self, func, *args):
+        """Run a blocking function in a worker thread, bounded by max_concurrency"""
+        async with self._semaphore:
+            return await asyncio.to_thread(func, *args)
+
+    async def map_blocking(self, func, items):
+        """Run func(*item) for every item concurrently and return the results in order"""
+        return await asyncio.gather(*(self.run_blocking(func, *item) for item in items))
+
+    def stats(self):
+        """Current tick lag and overrun counters"""
+        return {
+            "ticks": self.tick_count,
+            "overruns": self.overrun_count,
+            "skipped_ticks": self.skipped_ticks,
+            "last_lag_s": round(self.last_lag, 4),
+            "max_lag_s": round(self.max_lag, 4),
+            "avg_lag_s": round(self.total_lag / self.tick_count, 4) if self.tick_count else 0.0,
+            "last_duration_s": round(self.last_duration, 4),
+            "last_overrun_s": round(self.last_overrun, 4),
+            "max_overrun_s": round(self.max_overrun, 4),
+        }
+
+    async def run(self, tick, max_ticks=None):
+        """Await tick(step) on every deadline until max_ticks ticks have run (forever if None)"""
+        loop = asyncio.get_running_loop()
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        deadline = loop.time()
+
+        while max_ticks is None or self.tick_count < max_ticks:
+            delay = deadline - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            started = loop.time()
+            lag = max(0.0, started - deadline)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.total_lag += lag
+
+            await tick(self.tick_count)
+            self.tick_count += 1
+
+            finished = loop.time()
+            self.last_duration = finished - started
+            deadline += self.period
+
+            overrun = finished - deadline
+            self.last_overrun = max(0.0, overrun)
+            self.max_overrun = max(self.max_overrun, overrun)
+
+            if overrun > 0:
+                # Overran into the next slot: don't pile up the missed ticks
+                self.overrun_count += 1
+                missed = int(overrun // self.period)
+                if self.overrun_policy == "skip":
+                    missed += 1
+                self.skipped_ticks += missed
+                deadline += missed * self.period
+                print(f"⏱️ Tick {self.tick_count} overran by {overrun:.2f}s "
+                      f"({missed} tick(s) {'skipped' if self.overrun_policy == 'skip' else 'coalesced'})")
+
+        return self.stats()